@@ -2,14 +2,21 @@
 # pip install playwright fastapi uvicorn
 # python -m playwright install
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 import asyncio
+from collections import Counter
 from datetime import datetime, timedelta
+import os
 import re
+import secrets
+import socket
+import uuid
+
+from scrape_queue import ScrapeQueue, LISTING_JOB, DETAIL_JOB, DONE
 
 app = FastAPI()
 
@@ -33,6 +40,25 @@ class Hackathon(BaseModel):
     url: str
     tags: List[str]
 
+class ListingResult(BaseModel):
+    hackathons: List[Hackathon]
+
+class DetailResult(BaseModel):
+    url: str
+    description: Optional[str]
+
+class LeaseRequest(BaseModel):
+    worker_id: str
+    kinds: Optional[List[str]] = None
+
+class CompleteRequest(BaseModel):
+    lease_token: str
+    result: Dict[str, Any]
+
+class FailRequest(BaseModel):
+    lease_token: str
+    error: str
+
 # Global cache for hackathons
 hackathon_cache = {
     "data": [],
@@ -44,6 +70,52 @@ hackathon_cache = {
 CACHE_DURATION_HOURS = 6  # Refresh every 6 hours
 INITIAL_SCRAPE_DONE = False
 
+# Work queue configuration. Scrape work is split into jobs (one listing page per
+# source, optionally one job per detail page) so any number of workers can share it:
+# the in-process worker below, and remote ones started with `python worker.py`.
+QUEUE_PATH = os.getenv("SCRAPE_QUEUE_PATH", "scrape_queue.db")
+LOCAL_WORKER_PAGES = int(os.getenv("SCRAPE_LOCAL_PAGES", "4"))  # 0 = only remote workers
+SCRAPE_DETAIL_PAGES = os.getenv("SCRAPE_DETAIL_PAGES", "0") == "1"
+JOB_TIMEOUT_SECONDS = 45.0
+JOB_LEASE_SECONDS = 60  # job timeout plus time to open the page and submit
+JOB_MAX_ATTEMPTS = 2
+JOB_RETRY_DELAY_SECONDS = 5  # multiplied by the attempt number
+# Worst case for one job: every attempt runs out its lease, plus the backoff in between
+JOB_RETRY_BUDGET_SECONDS = (JOB_MAX_ATTEMPTS * JOB_LEASE_SECONDS
+                            + sum(JOB_RETRY_DELAY_SECONDS * n for n in range(1, JOB_MAX_ATTEMPTS)))
+# Listings, then (optionally) the detail pages they fan out to
+BATCH_TIMEOUT_SECONDS = int(os.getenv(
+    "SCRAPE_BATCH_TIMEOUT",
+    str(JOB_RETRY_BUDGET_SECONDS * (2 if SCRAPE_DETAIL_PAGES else 1) + 15)
+))
+INITIAL_WAIT_SECONDS = 45  # how long the first /hackathons request waits for a scrape
+WORKER_POLL_SECONDS = 2
+WORKER_ERROR_BACKOFF_SECONDS = 30
+# Remote workers must send this in the X-Worker-Secret header; /jobs/* is disabled without it
+WORKER_SECRET = os.getenv("SCRAPE_WORKER_SECRET")
+
+_scrape_queue = None
+
+def get_queue():
+    """Open the shared job queue on first use"""
+    global _scrape_queue
+    if _scrape_queue is None:
+        _scrape_queue = ScrapeQueue(
+            QUEUE_PATH,
+            lease_seconds=JOB_LEASE_SECONDS,
+            max_attempts=JOB_MAX_ATTEMPTS,
+            retry_delay=JOB_RETRY_DELAY_SECONDS
+        )
+    return _scrape_queue
+
+# Listing pages used as the url of hackathons whose card has no link of its own
+SOURCE_URLS = {
+    'Devpost': 'https://devpost.com/hackathons',
+    'MLH': 'https://mlh.io/seasons/2025/events',
+    'ETHGlobal': 'https://ethglobal.com/events',
+    'Devfolio': 'https://devfolio.co/hackathons',
+}
+
 # Scraper functions for different websites
 async def scrape_devpost(page):
     hackathons = []
@@ -80,7 +152,7 @@ async def scrape_devpost(page):
                     'location': 'Virtual/Hybrid',
                     'prize': 'Prizes Available',
                     'source': 'Devpost',
-                    'url': url or 'https://devpost.com/hackathons',
+                    'url': url or SOURCE_URLS['Devpost'],
                     'tags': ['General', 'Open', 'Tech']
                 })
             except Exception as e:
@@ -128,7 +200,7 @@ async def scrape_mlh(page):
                     'location': location,
                     'prize': 'MLH Prize Pool',
                     'source': 'MLH',
-                    'url': url or 'https://mlh.io/seasons/2025/events',
+                    'url': url or SOURCE_URLS['MLH'],
                     'tags': ['MLH', 'Student', 'Verified']
                 })
             except Exception as e:
@@ -179,7 +251,7 @@ async def scrape_ethglobal(page):
                     'location': 'Global',
                     'prize': '$100,000+ Pool',
                     'source': 'ETHGlobal',
-                    'url': url or 'https://ethglobal.com/events',
+                    'url': url or SOURCE_URLS['ETHGlobal'],
                     'tags': ['Blockchain', 'Ethereum', 'Web3', 'DeFi']
                 })
                 
@@ -231,7 +303,7 @@ async def scrape_devfolio(page):
                     'location': 'India/Virtual',
                     'prize': 'Cash Prizes',
                     'source': 'Devfolio',
-                    'url': url or 'https://devfolio.co/hackathons',
+                    'url': url or SOURCE_URLS['Devfolio'],
                     'tags': ['India', 'Innovation', 'Tech']
                 })
                 
@@ -247,103 +319,264 @@ async def scrape_devfolio(page):
     print(f"   ✅ Scraped {len(hackathons)} hackathons from Devfolio")
     return hackathons
 
-async def perform_scraping():
-    """Core scraping logic that updates the cache"""
-    print("\n" + "="*50)
-    print("🚀 Starting hackathon scraping...")
-    print("="*50)
-    
+async def scrape_detail(page, url):
+    """Fetch a hackathon's own page and pull its description"""
+    await page.goto(url, timeout=30000, wait_until='domcontentloaded')
+    description = None
+    for selector in ['meta[name="description"]', 'meta[property="og:description"]']:
+        meta = await page.query_selector(selector)
+        content = await meta.get_attribute('content') if meta else None
+        if content and content.strip():
+            description = content.strip()[:150]
+            break
+    return {'url': url, 'description': description}
+
+SCRAPERS = {
+    'Devpost': scrape_devpost,
+    'MLH': scrape_mlh,
+    'ETHGlobal': scrape_ethglobal,
+    'Devfolio': scrape_devfolio,
+}
+
+async def run_job(page, job):
+    """Execute a single queued job and return its result payload"""
+    if job["kind"] == LISTING_JOB:
+        source = job["payload"]["source"]
+        # An empty listing is a valid result: the scrapers already swallow their own
+        # errors, so retrying it would only delay the batch
+        return {"hackathons": await SCRAPERS[source](page)}
+    if job["kind"] == DETAIL_JOB:
+        return await scrape_detail(page, job["payload"]["url"])
+    raise ValueError(f"unknown job kind: {job['kind']}")
+
+def validate_result(job, result):
+    """Check a submitted result against the shape its job kind produces.
+    Raises ValueError (pydantic's ValidationError) if it does not match."""
+    if job["kind"] == LISTING_JOB:
+        return ListingResult.model_validate(result).model_dump()
+    if job["kind"] == DETAIL_JOB:
+        detail = DetailResult.model_validate(result).model_dump()
+        if detail["url"] != job["payload"]["url"]:
+            raise ValueError("result url does not match the job")
+        return detail
+    raise ValueError(f"unknown job kind: {job['kind']}")
+
+def detail_urls(hackathons):
+    """URLs that are a single hackathon's own page, i.e. worth a detail job.
+    Source fallback urls and urls shared by several cards are left out, as their
+    description would be copied onto every hackathon using them."""
+    counts = Counter(h['url'] for h in hackathons)
+    fallbacks = set(SOURCE_URLS.values())
+    return {url for url, n in counts.items() if url and n == 1 and url.rstrip('/') not in fallbacks}
+
+def submit_result(job_id, lease_token, result):
+    """Record a job result; completing a listing may fan out detail jobs"""
+    queue = get_queue()
+    job = queue.get(job_id)
+    if job is None:
+        return False
+    result = validate_result(job, result)
+
+    follow_ups = []
+    if SCRAPE_DETAIL_PAGES and job["kind"] == LISTING_JOB:
+        urls = detail_urls(result["hackathons"])
+        follow_ups = [(DETAIL_JOB, {"url": h["url"]}) for h in result["hackathons"] if h["url"] in urls]
+    return queue.complete(job_id, lease_token, result, follow_ups)
+
+class LocalQueueClient:
+    """Worker-side access to the queue from inside the API process"""
+
+    async def lease(self, worker_id):
+        return await asyncio.to_thread(get_queue().lease, worker_id)
+
+    async def complete(self, job_id, lease_token, result):
+        return await asyncio.to_thread(submit_result, job_id, lease_token, result)
+
+    async def fail(self, job_id, lease_token, error):
+        return await asyncio.to_thread(get_queue().fail, job_id, lease_token, error)
+
+async def process_job(client, context, worker_id, job):
+    """Run one leased job and report the outcome. Only raises on cancellation."""
+    page = None
+    try:
+        page = await context.new_page()
+        result = await asyncio.wait_for(run_job(page, job), timeout=JOB_TIMEOUT_SECONDS)
+        await client.complete(job["id"], job["lease_token"], result)
+    except asyncio.CancelledError:
+        # A sibling slot failed and the browser is going away; let another worker retry
+        await release_job(client, worker_id, job, "worker stopped")
+        raise
+    except Exception as e:
+        print(f"⚠️  [{worker_id}] {job['kind']} job failed (attempt {job['attempts']}): {e}")
+        await release_job(client, worker_id, job, f"{type(e).__name__}: {e}")
+    finally:
+        if page:
+            try:
+                await page.close()
+            except Exception as e:
+                print(f"⚠️  [{worker_id}] Could not close page: {e}")
+
+async def release_job(client, worker_id, job, error):
+    """Hand a job back to the queue; if even that fails its lease will expire"""
+    try:
+        await client.fail(job["id"], job["lease_token"], error)
+    except Exception as e:
+        print(f"⚠️  [{worker_id}] Could not release job {job['id']}: {e}")
+
+async def run_worker(client, worker_id, concurrency=1):
+    """Pull jobs forever, running up to `concurrency` pages in one browser.
+    The browser is only kept open while there is work in the queue."""
+    print(f"👷 Worker {worker_id} started ({concurrency} pages)")
+    while True:
+        job = None  # leased but not yet handed to a page slot
+        try:
+            job = await client.lease(worker_id)
+            if not job:
+                await asyncio.sleep(WORKER_POLL_SECONDS)
+                continue
+
+            async with async_playwright() as p:
+                browser = await p.chromium.launch(
+                    headless=True,
+                    args=['--no-sandbox', '--disable-setuid-sandbox']
+                )
+
+                async def slot(job):
+                    while True:
+                        if job is None:
+                            try:
+                                job = await client.lease(worker_id)
+                            except Exception as e:
+                                print(f"⚠️  [{worker_id}] Lease failed: {e}")
+                                return
+                            if not job:
+                                return
+                        await process_job(client, context, worker_id, job)
+                        job = None
+
+                try:
+                    context = await browser.new_context(
+                        user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                        viewport={'width': 1920, 'height': 1080}
+                    )
+                    first_job, job = job, None
+                    # A TaskGroup cancels the other slots if one fails, so none keeps
+                    # leasing jobs against the closed browser
+                    async with asyncio.TaskGroup() as slots:
+                        slots.create_task(slot(first_job))
+                        for _ in range(concurrency - 1):
+                            slots.create_task(slot(None))
+                finally:
+                    await browser.close()
+
+        except Exception as e:
+            # e.g. browsers not installed, or the queue is unreachable/locked
+            print(f"❌ [{worker_id}] Worker error, retrying in {WORKER_ERROR_BACKOFF_SECONDS}s: {e}")
+            if job:
+                await release_job(client, worker_id, job, f"{type(e).__name__}: {e}")
+            await asyncio.sleep(WORKER_ERROR_BACKOFF_SECONDS)
+
+def collect_batch(batch):
+    """Merge the results of a finished batch into a de-duplicated hackathon list"""
+    queue = get_queue()
     all_hackathons = []
-    
-    async with async_playwright() as p:
-        print("🌐 Launching browser...")
-        browser = await p.chromium.launch(
-            headless=True,
-            args=['--no-sandbox', '--disable-setuid-sandbox']
-        )
-        context = await browser.new_context(
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            viewport={'width': 1920, 'height': 1080}
-        )
-        
-        # Create pages for each scraper
-        pages = []
-        for _ in range(4):
-            page = await context.new_page()
-            pages.append(page)
-        
-        print("\n📡 Scraping from 4 sources concurrently...\n")
-        
-        # Run scrapers concurrently with timeout
-        tasks = [
-            scrape_devpost(pages[0]),
-            scrape_mlh(pages[1]),
-            scrape_ethglobal(pages[2]),
-            scrape_devfolio(pages[3])
-        ]
-        
+    descriptions = {}
+    for job in queue.batch_jobs(batch):
+        if job["status"] != DONE:
+            print(f"⚠️  {job['kind']} job {job['payload']} {job['status']}: {job['error']}")
+            continue
         try:
-            results = await asyncio.wait_for(
-                asyncio.gather(*tasks, return_exceptions=True),
-                timeout=45.0
-            )
-            
-            # Collect results
-            for result in results:
-                if isinstance(result, list):
-                    all_hackathons.extend(result)
-                elif isinstance(result, Exception):
-                    print(f"⚠️  Scraper exception: {result}")
-                    
-        except asyncio.TimeoutError:
-            print("⏱️  Scraping timeout - returning partial results")
-        
-        await browser.close()
-    
+            result = validate_result(job, job["result"])
+        except ValueError as e:
+            print(f"⚠️  Skipping malformed {job['kind']} result {job['payload']}: {e}")
+            continue
+
+        if job["kind"] == LISTING_JOB:
+            all_hackathons.extend(result["hackathons"])
+        elif result["description"]:
+            descriptions[result["url"]] = result["description"]
+
     # Remove duplicates
     unique_hackathons = []
     seen_titles = set()
-    
+    own_urls = detail_urls(all_hackathons)
+
     for h in all_hackathons:
         title_key = re.sub(r'[^a-z0-9]', '', h['title'].lower())
         if title_key not in seen_titles and len(title_key) > 3:
             seen_titles.add(title_key)
+            if h['url'] in descriptions and h['url'] in own_urls:
+                h['description'] = descriptions[h['url']]
             unique_hackathons.append(h)
-    
+
+    return unique_hackathons
+
+async def perform_scraping():
+    """Queue one scrape batch, wait for workers to finish it and return the results"""
+    print("\n" + "="*50)
+    print("🚀 Starting hackathon scraping...")
+    print("="*50)
+
+    queue = get_queue()
+    batch = datetime.now().strftime('%Y%m%d%H%M%S') + '-' + uuid.uuid4().hex[:8]
+    for source in SCRAPERS:
+        await asyncio.to_thread(queue.enqueue, batch, LISTING_JOB, {"source": source})
+
+    print(f"\n📡 Queued {len(SCRAPERS)} sources as batch {batch}...\n")
+
+    deadline = asyncio.get_running_loop().time() + BATCH_TIMEOUT_SECONDS
+    while not await asyncio.to_thread(queue.batch_finished, batch):
+        if asyncio.get_running_loop().time() > deadline:
+            cancelled = await asyncio.to_thread(queue.cancel_batch, batch)
+            print(f"⏱️  Scraping timeout - cancelled {cancelled} unfinished jobs, returning partial results")
+            break
+        await asyncio.sleep(WORKER_POLL_SECONDS)
+
+    unique_hackathons = await asyncio.to_thread(collect_batch, batch)
+
     print("\n" + "="*50)
     print(f"✅ Successfully scraped {len(unique_hackathons)} unique hackathons!")
     print("="*50 + "\n")
-    
+
     return unique_hackathons[:40]
 
+async def refresh_cache():
+    """Scrape once and store the results in the cache"""
+    global INITIAL_SCRAPE_DONE
+
+    hackathon_cache["is_scraping"] = True
+    try:
+        hackathons = await perform_scraping()
+
+        # Update cache
+        hackathon_cache["data"] = hackathons
+        hackathon_cache["last_updated"] = datetime.now()
+        INITIAL_SCRAPE_DONE = True
+
+        print(f"💾 Cache updated at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+        # Keep the queue database small: drop jobs from earlier refreshes
+        await asyncio.to_thread(get_queue().purge, older_than_seconds=CACHE_DURATION_HOURS * 60 * 60 * 2)
+    finally:
+        hackathon_cache["is_scraping"] = False
+
+_refresh_task = None
+
+def start_refresh():
+    """Start a cache refresh, or return the one already running"""
+    global _refresh_task
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.create_task(refresh_cache())
+    return _refresh_task
+
 async def background_scraper():
     """Background task that continuously scrapes hackathons"""
-    global INITIAL_SCRAPE_DONE
-    
     while True:
         try:
-            if hackathon_cache["is_scraping"]:
-                print("⏳ Scraping already in progress, skipping...")
-                await asyncio.sleep(60)
-                continue
-            
-            hackathon_cache["is_scraping"] = True
-            
-            # Perform scraping
-            hackathons = await perform_scraping()
-            
-            # Update cache
-            hackathon_cache["data"] = hackathons
-            hackathon_cache["last_updated"] = datetime.now()
-            INITIAL_SCRAPE_DONE = True
-            
-            print(f"💾 Cache updated at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            await start_refresh()
             print(f"⏰ Next update in {CACHE_DURATION_HOURS} hours\n")
-            
         except Exception as e:
             print(f"❌ Background scraping error: {e}")
-        finally:
-            hackathon_cache["is_scraping"] = False
         
         # Wait for configured duration before next scrape
         await asyncio.sleep(CACHE_DURATION_HOURS * 60 * 60)
@@ -364,9 +597,13 @@ async def startup_event():
     print("="*60)
     print(f"⚙️  Cache refresh interval: {CACHE_DURATION_HOURS} hours")
     print(f"🔄 Background scraping: ENABLED")
+    print(f"👷 Local scrape worker pages: {LOCAL_WORKER_PAGES}")
+    print(f"⏱️  Batch timeout: {BATCH_TIMEOUT_SECONDS}s (job retry budget {JOB_RETRY_BUDGET_SECONDS}s)")
     print("="*60 + "\n")
     
-    # Start background task
+    # Start the local worker, then the background task that feeds it
+    if LOCAL_WORKER_PAGES > 0:
+        asyncio.create_task(run_worker(LocalQueueClient(), f"{socket.gethostname()}-local", LOCAL_WORKER_PAGES))
     asyncio.create_task(background_scraper())
 
 @app.get("/")
@@ -383,7 +620,10 @@ async def root():
         "refresh_interval_hours": CACHE_DURATION_HOURS,
         "endpoints": {
             "/hackathons": "GET - Fetch all hackathons (cached)",
-            "/health": "GET - Health check with cache info"
+            "/health": "GET - Health check with cache info",
+            "/jobs/lease": "POST - Lease the next scrape job (workers)",
+            "/jobs/{job_id}/complete": "POST - Submit a job result (workers)",
+            "/jobs/{job_id}/fail": "POST - Report a failed job (workers)"
         }
     }
 
@@ -391,19 +631,13 @@ async def root():
 async def get_hackathons():
     """
     Returns cached hackathons. Cache is automatically refreshed every 6 hours.
-    If cache is empty (first request), triggers immediate scraping.
+    If cache is empty (first request), waits a short while for the initial scrape.
     """
     
-    # If cache is empty and no scraping in progress, do initial scrape
-    if not hackathon_cache["data"] and not hackathon_cache["is_scraping"] and not INITIAL_SCRAPE_DONE:
-        print("📭 Cache empty - performing initial scrape...")
-        hackathon_cache["is_scraping"] = True
-        try:
-            hackathons = await perform_scraping()
-            hackathon_cache["data"] = hackathons
-            hackathon_cache["last_updated"] = datetime.now()
-        finally:
-            hackathon_cache["is_scraping"] = False
+    # If cache is empty, wait for the initial scrape without blocking for the whole batch
+    if not hackathon_cache["data"] and not INITIAL_SCRAPE_DONE:
+        print("📭 Cache empty - waiting for initial scrape...")
+        await asyncio.wait({start_refresh()}, timeout=INITIAL_WAIT_SECONDS)
     
     # Return cached data
     if hackathon_cache["data"]:
@@ -432,11 +666,43 @@ async def health():
             "hackathon_count": len(hackathon_cache["data"]),
             "is_scraping": hackathon_cache["is_scraping"]
         },
+        "queue": await asyncio.to_thread(get_queue().stats),
         "config": {
-            "refresh_interval_hours": CACHE_DURATION_HOURS
+            "refresh_interval_hours": CACHE_DURATION_HOURS,
+            "local_worker_pages": LOCAL_WORKER_PAGES
         }
     }
 
+def require_worker_secret(x_worker_secret: Optional[str] = Header(None)):
+    """Guard for the /jobs/* routes used by remote workers"""
+    if not WORKER_SECRET:
+        raise HTTPException(status_code=503, detail="Remote workers are disabled (SCRAPE_WORKER_SECRET not set)")
+    if not x_worker_secret or not secrets.compare_digest(x_worker_secret, WORKER_SECRET):
+        raise HTTPException(status_code=401, detail="Invalid worker secret")
+
+@app.post("/jobs/lease", dependencies=[Depends(require_worker_secret)])
+async def lease_job(request: LeaseRequest):
+    """Hand the next available job to a worker, or null if the queue is empty"""
+    return await asyncio.to_thread(get_queue().lease, request.worker_id, request.kinds)
+
+@app.post("/jobs/{job_id}/complete", dependencies=[Depends(require_worker_secret)])
+async def complete_job(job_id: str, request: CompleteRequest):
+    """Submit a job result. Stale leases and repeated submissions are not accepted."""
+    if not await asyncio.to_thread(get_queue().get, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    try:
+        accepted = await asyncio.to_thread(submit_result, job_id, request.lease_token, request.result)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid result: {e}")
+    return {"accepted": accepted}
+
+@app.post("/jobs/{job_id}/fail", dependencies=[Depends(require_worker_secret)])
+async def fail_job(job_id: str, request: FailRequest):
+    if not await asyncio.to_thread(get_queue().get, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    accepted = await asyncio.to_thread(get_queue().fail, job_id, request.lease_token, request.error)
+    return {"accepted": accepted}
+
 if __name__ == "__main__":
     import uvicorn
     print("\n🚀 Starting Hackathon Aggregator API with Auto-Refresh...")
@@ -0,0 +1,282 @@
+import json
+import sqlite3
+import time
+import uuid
+
+# Job kinds
+LISTING_JOB = "listing"   # payload: {"source": "Devpost"}
+DETAIL_JOB = "detail"     # payload: {"url": "https://..."}
+
+# Job states
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    batch TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    lease_token TEXT,
+    lease_owner TEXT,
+    lease_expires REAL,
+    available_at REAL NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, available_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs (batch);
+"""
+
+
+class ScrapeQueue:
+    """Durable SQLite-backed queue of scrape jobs with leases and retries.
+
+    Jobs are keyed by a deterministic id (batch + kind + payload), so enqueueing
+    the same work twice is a no-op. Workers lease a job for a limited time; a
+    lease that is not completed before it expires is handed to another worker.
+    Only the current lease holder may complete a job; once it is done, repeated
+    submissions are ignored, so completion is idempotent.
+    """
+
+    def __init__(self, path="scrape_queue.db", lease_seconds=60, max_attempts=2, retry_delay=5, busy_timeout=30):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @staticmethod
+    def job_id(batch, kind, payload):
+        key = json.dumps([batch, kind, payload], sort_keys=True)
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, key))
+
+    @staticmethod
+    def _to_dict(row):
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def _insert(self, conn, batch, kind, payload, max_attempts, now):
+        job_id = self.job_id(batch, kind, payload)
+        conn.execute(
+            "INSERT OR IGNORE INTO jobs (id, batch, kind, payload, status, max_attempts, "
+            "available_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, batch, kind, json.dumps(payload), PENDING,
+             max_attempts or self.max_attempts, now, now, now),
+        )
+        return job_id
+
+    def enqueue(self, batch, kind, payload, max_attempts=None):
+        """Add a job unless an identical one already exists; returns the job id"""
+        conn = self._connect()
+        try:
+            return self._insert(conn, batch, kind, payload, max_attempts, time.time())
+        finally:
+            conn.close()
+
+    def lease(self, worker_id, kinds=None, lease_seconds=None):
+        """Claim the next available job for `worker_id`, or return None"""
+        now = time.time()
+        lease_seconds = lease_seconds or self.lease_seconds
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._expire_leases(conn, now)
+            query = "SELECT * FROM jobs WHERE status = ? AND available_at <= ?"
+            params = [PENDING, now]
+            if kinds:
+                query += f" AND kind IN ({','.join('?' * len(kinds))})"
+                params.extend(kinds)
+            query += " ORDER BY available_at, created_at LIMIT 1"
+            row = conn.execute(query, params).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            token = uuid.uuid4().hex
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_token = ?, lease_owner = ?, "
+                "lease_expires = ?, updated_at = ? WHERE id = ?",
+                (LEASED, token, worker_id, now + lease_seconds, now, row["id"]),
+            )
+            conn.execute("COMMIT")
+            job = self._to_dict(row)
+            job.update(status=LEASED, attempts=row["attempts"] + 1, lease_token=token,
+                       lease_owner=worker_id, lease_expires=now + lease_seconds)
+            return job
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _expire_leases(self, conn, now):
+        """Return expired leases to the queue, or fail them once out of attempts"""
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = 'lease expired', lease_token = NULL, updated_at = ? "
+            "WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts",
+            (FAILED, now, LEASED, now),
+        )
+        conn.execute(
+            "UPDATE jobs SET status = ?, lease_token = NULL, available_at = ?, updated_at = ? "
+            "WHERE status = ? AND lease_expires < ?",
+            (PENDING, now, now, LEASED, now),
+        )
+
+    def complete(self, job_id, lease_token, result, follow_ups=()):
+        """Store the result of a leased job. Returns False if it was not accepted:
+        the job is already done (repeat submission) or `lease_token` is not the
+        current lease.
+
+        `follow_ups` are (kind, payload) jobs added to the same batch in the same
+        transaction, so the batch never looks finished in between.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT batch FROM jobs WHERE id = ? AND status = ? AND lease_token = ?",
+                (job_id, LEASED, lease_token),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return False
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_token = NULL, updated_at = ? "
+                "WHERE id = ?",
+                (DONE, json.dumps(result), now, job_id),
+            )
+            for kind, payload in follow_ups:
+                self._insert(conn, row["batch"], kind, payload, None, now)
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def fail(self, job_id, lease_token, error):
+        """Release a leased job for retry, or mark it failed once out of attempts.
+
+        Only the current lease holder may fail a job, so a worker whose lease
+        already expired cannot clobber the retry another worker is running.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = ? AND lease_token = ?",
+                (job_id, LEASED, lease_token),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return False
+            if row["attempts"] >= row["max_attempts"]:
+                status, available_at = FAILED, now
+            else:
+                status, available_at = PENDING, now + self.retry_delay * row["attempts"]
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_token = NULL, available_at = ?, updated_at = ? "
+                "WHERE id = ?",
+                (status, str(error)[:500], available_at, now, job_id),
+            )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def get(self, job_id):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._to_dict(row) if row else None
+        finally:
+            conn.close()
+
+    def batch_jobs(self, batch, kind=None):
+        """All jobs of a batch, optionally filtered by kind"""
+        conn = self._connect()
+        try:
+            query, params = "SELECT * FROM jobs WHERE batch = ?", [batch]
+            if kind:
+                query += " AND kind = ?"
+                params.append(kind)
+            rows = conn.execute(query + " ORDER BY created_at", params).fetchall()
+            return [self._to_dict(row) for row in rows]
+        finally:
+            conn.close()
+
+    def batch_finished(self, batch):
+        """True once every job of the batch is done or permanently failed"""
+        conn = self._connect()
+        try:
+            self._expire_leases(conn, time.time())
+            row = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE batch = ? AND status IN (?, ?)",
+                (batch, PENDING, LEASED),
+            ).fetchone()
+            return row[0] == 0
+        finally:
+            conn.close()
+
+    def cancel_batch(self, batch, reason="batch timed out"):
+        """Fail every job of the batch that has not finished yet.
+        Workers still running one will have their result rejected."""
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_token = NULL, updated_at = ? "
+                "WHERE batch = ? AND status IN (?, ?)",
+                (FAILED, reason, time.time(), batch, PENDING, LEASED),
+            )
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def stats(self):
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+            return {row["status"]: row["n"] for row in rows}
+        finally:
+            conn.close()
+
+    def purge(self, older_than_seconds):
+        """Drop finished jobs older than the given age"""
+        conn = self._connect()
+        try:
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (DONE, FAILED, time.time() - older_than_seconds),
+            )
+        finally:
+            conn.close()
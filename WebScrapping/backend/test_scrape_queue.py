@@ -0,0 +1,328 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+import scrape_queue
+from scrape_queue import ScrapeQueue, LISTING_JOB, DETAIL_JOB, PENDING, LEASED, DONE, FAILED
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(scrape_queue, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return ScrapeQueue(str(tmp_path / "queue.db"), lease_seconds=60, max_attempts=2, retry_delay=5)
+
+
+def test_enqueue_is_idempotent(queue):
+    first = queue.enqueue("b1", LISTING_JOB, {"source": "MLH"})
+    second = queue.enqueue("b1", LISTING_JOB, {"source": "MLH"})
+
+    assert first == second
+    assert len(queue.batch_jobs("b1")) == 1
+
+
+def test_lease_hands_each_job_to_one_worker(queue):
+    queue.enqueue("b1", LISTING_JOB, {"source": "MLH"})
+    queue.enqueue("b1", LISTING_JOB, {"source": "Devpost"})
+
+    a = queue.lease("w1")
+    b = queue.lease("w2")
+
+    assert {a["id"], b["id"]} == {j["id"] for j in queue.batch_jobs("b1")}
+    assert a["status"] == LEASED and a["attempts"] == 1 and a["lease_owner"] == "w1"
+    assert queue.lease("w3") is None
+
+
+def test_expired_lease_returns_job_to_queue(queue, clock):
+    queue.enqueue("b1", LISTING_JOB, {"source": "MLH"})
+    first = queue.lease("w1")
+
+    clock.now += 30
+    assert queue.lease("w2") is None
+
+    clock.now += 31
+    second = queue.lease("w2")
+    assert second["id"] == first["id"]
+    assert second["attempts"] == 2
+    assert second["lease_token"] != first["lease_token"]
+
+
+def test_expired_lease_fails_job_after_max_attempts(queue, clock):
+    job_id = queue.enqueue("b1", LISTING_JOB, {"source": "MLH"})
+    queue.lease("w1")
+    clock.now += 61
+    queue.lease("w2")
+    clock.now += 61
+
+    assert queue.lease("w3") is None
+    assert queue.get(job_id)["status"] == FAILED
+    assert queue.get(job_id)["error"] == "lease expired"
+    assert queue.batch_finished("b1")
+
+
+def test_fail_retries_with_backoff_then_gives_up(queue, clock):
+    job_id = queue.enqueue("b1", LISTING_JOB, {"source": "MLH"})
+    job = queue.lease("w1")
+
+    assert queue.fail(job_id, job["lease_token"], "timeout")
+    assert queue.get(job_id)["status"] == PENDING
+    assert queue.lease("w1") is None  # still backing off
+
+    clock.now += 5
+    job = queue.lease("w1")
+    assert job["attempts"] == 2
+
+    assert queue.fail(job_id, job["lease_token"], "timeout again")
+    assert queue.get(job_id)["status"] == FAILED
+    assert queue.get(job_id)["error"] == "timeout again"
+
+
+def test_fail_with_stale_lease_is_rejected(queue, clock):
+    job_id = queue.enqueue("b1", LISTING_JOB, {"source": "MLH"})
+    stale = queue.lease("w1")
+    clock.now += 61
+    current = queue.lease("w2")
+
+    assert not queue.fail(job_id, stale["lease_token"], "late failure")
+    job = queue.get(job_id)
+    assert job["status"] == LEASED and job["lease_token"] == current["lease_token"]
+
+
+def test_complete_is_idempotent(queue):
+    job_id = queue.enqueue("b1", LISTING_JOB, {"source": "MLH"})
+    job = queue.lease("w1")
+
+    assert queue.complete(job_id, job["lease_token"], {"hackathons": [1]})
+    assert not queue.complete(job_id, job["lease_token"], {"hackathons": [2]})
+    assert queue.get(job_id)["status"] == DONE
+    assert queue.get(job_id)["result"] == {"hackathons": [1]}
+
+
+def test_complete_requires_current_lease(queue, clock):
+    job_id = queue.enqueue("b1", LISTING_JOB, {"source": "MLH"})
+    assert not queue.complete(job_id, None, {})
+    assert not queue.complete(job_id, "guess", {})
+
+    stale = queue.lease("w1")
+    clock.now += 61
+    queue.lease("w2")
+
+    assert not queue.complete(job_id, stale["lease_token"], {"hackathons": []})
+    assert queue.get(job_id)["status"] == LEASED
+
+
+def test_complete_adds_follow_ups_to_the_batch(queue):
+    job_id = queue.enqueue("b1", LISTING_JOB, {"source": "MLH"})
+    job = queue.lease("w1")
+
+    queue.complete(job_id, job["lease_token"], {"hackathons": []},
+                   [(DETAIL_JOB, {"url": "https://a.example"}), (DETAIL_JOB, {"url": "https://b.example"})])
+
+    details = queue.batch_jobs("b1", DETAIL_JOB)
+    assert [j["payload"]["url"] for j in details] == ["https://a.example", "https://b.example"]
+    assert not queue.batch_finished("b1")
+
+
+def test_cancel_batch_rejects_late_results(queue):
+    job_id = queue.enqueue("b1", LISTING_JOB, {"source": "MLH"})
+    queue.enqueue("b1", LISTING_JOB, {"source": "Devpost"})
+    job = queue.lease("w1")
+
+    assert queue.cancel_batch("b1") == 2
+    assert queue.batch_finished("b1")
+    assert not queue.complete(job_id, job["lease_token"], {"hackathons": []})
+    assert queue.get(job_id)["status"] == FAILED
+
+
+def test_locked_database_raises_the_real_error(tmp_path):
+    queue = ScrapeQueue(str(tmp_path / "queue.db"), busy_timeout=0.1)
+    queue.enqueue("b1", LISTING_JOB, {"source": "MLH"})
+
+    blocker = sqlite3.connect(str(tmp_path / "queue.db"), isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            queue.lease("w1")
+    finally:
+        blocker.execute("ROLLBACK")
+        blocker.close()
+
+
+@pytest.fixture
+def backend(monkeypatch, queue):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("playwright")
+    import backend
+    monkeypatch.setattr(backend, "_scrape_queue", queue)
+    return backend
+
+
+def hackathon(title, url):
+    return {"id": 1, "title": title, "description": "", "date": "2025", "location": "Online",
+            "prize": None, "source": "MLH", "url": url, "tags": []}
+
+
+def test_collect_batch_skips_failed_and_malformed_jobs(backend, queue):
+    good = queue.enqueue("b1", LISTING_JOB, {"source": "MLH"})
+    bad = queue.enqueue("b1", LISTING_JOB, {"source": "Devpost"})
+    queue.enqueue("b1", LISTING_JOB, {"source": "ETHGlobal"})
+    leases = {job["id"]: job["lease_token"] for job in (queue.lease("w") for _ in range(3))}
+
+    queue.complete(good, leases[good], {"hackathons": [hackathon("HackMIT 2025", "https://hackmit.org")]},
+                   [(DETAIL_JOB, {"url": "https://hackmit.org"})])
+    queue.complete(bad, leases[bad], {})
+    queue.cancel_batch("b1")  # ETHGlobal listing and the detail page never finish
+
+    hackathons = backend.collect_batch("b1")
+
+    assert [h["title"] for h in hackathons] == ["HackMIT 2025"]
+
+
+def test_submit_result_validates_against_job_kind(backend, queue):
+    job_id = queue.enqueue("b1", DETAIL_JOB, {"url": "https://hackmit.org"})
+    job = queue.lease("w1")
+
+    with pytest.raises(ValueError):
+        backend.submit_result(job_id, job["lease_token"], {"hackathons": []})
+    with pytest.raises(ValueError):
+        backend.submit_result(job_id, job["lease_token"], {"url": "https://evil.example", "description": "x"})
+
+    assert backend.submit_result(job_id, job["lease_token"], {"url": "https://hackmit.org", "description": "MIT"})
+    assert queue.get(job_id)["result"] == {"url": "https://hackmit.org", "description": "MIT"}
+
+
+def test_detail_jobs_skip_fallback_and_shared_urls(backend, queue, monkeypatch):
+    monkeypatch.setattr(backend, "SCRAPE_DETAIL_PAGES", True)
+    job_id = queue.enqueue("b1", LISTING_JOB, {"source": "Devpost"})
+    job = queue.lease("w1")
+    listing = [
+        hackathon("Alpha Hack", "https://devpost.com/hackathons"),
+        hackathon("Beta Hack", "https://devpost.com/hackathons"),
+        hackathon("Gamma Hack", "https://gamma.devpost.com/"),
+        hackathon("Delta Hack", "https://shared.example"),
+        hackathon("Epsilon Hack", "https://shared.example"),
+    ]
+
+    assert backend.submit_result(job_id, job["lease_token"], {"hackathons": listing})
+
+    assert [j["payload"]["url"] for j in queue.batch_jobs("b1", DETAIL_JOB)] == ["https://gamma.devpost.com/"]
+
+
+def test_collect_batch_keeps_own_descriptions_for_fallback_urls(backend, queue):
+    listing_id = queue.enqueue("b1", LISTING_JOB, {"source": "Devpost"})
+    detail_id = queue.enqueue("b1", DETAIL_JOB, {"url": "https://devpost.com/hackathons"})
+    leases = {job["id"]: job["lease_token"] for job in (queue.lease("w") for _ in range(2))}
+    alpha = dict(hackathon("Alpha Hack", "https://devpost.com/hackathons"), description="Alpha's own")
+    beta = dict(hackathon("Beta Hack", "https://devpost.com/hackathons"), description="Beta's own")
+
+    queue.complete(listing_id, leases[listing_id], {"hackathons": [alpha, beta]})
+    queue.complete(detail_id, leases[detail_id],
+                   {"url": "https://devpost.com/hackathons", "description": "Browse hundreds of online hackathons"})
+
+    hackathons = backend.collect_batch("b1")
+
+    assert [h["description"] for h in hackathons] == ["Alpha's own", "Beta's own"]
+
+
+def test_worker_routes_are_disabled_without_a_secret(backend, monkeypatch):
+    monkeypatch.setattr(backend, "WORKER_SECRET", None)
+
+    with pytest.raises(backend.HTTPException) as exc:
+        backend.require_worker_secret("anything")
+    assert exc.value.status_code == 503
+
+
+def test_worker_routes_reject_a_wrong_secret(backend, monkeypatch):
+    monkeypatch.setattr(backend, "WORKER_SECRET", "s3cret")
+
+    for secret in (None, "", "wrong"):
+        with pytest.raises(backend.HTTPException) as exc:
+            backend.require_worker_secret(secret)
+        assert exc.value.status_code == 401
+    backend.require_worker_secret("s3cret")
+
+
+def test_complete_job_rejects_unknown_jobs_and_malformed_results(backend, queue):
+    with pytest.raises(backend.HTTPException) as exc:
+        asyncio.run(backend.complete_job("missing", backend.CompleteRequest(lease_token="x", result={})))
+    assert exc.value.status_code == 404
+
+    job_id = queue.enqueue("b1", LISTING_JOB, {"source": "MLH"})
+    job = queue.lease("w1")
+    with pytest.raises(backend.HTTPException) as exc:
+        asyncio.run(backend.complete_job(job_id, backend.CompleteRequest(
+            lease_token=job["lease_token"], result={"hackathons": [{"title": "No other fields"}]})))
+    assert exc.value.status_code == 422
+    assert queue.get(job_id)["status"] == LEASED
+
+    response = asyncio.run(backend.complete_job(job_id, backend.CompleteRequest(
+        lease_token=job["lease_token"], result={"hackathons": []})))
+    assert response == {"accepted": True}
+
+
+class FakeClient:
+    def __init__(self):
+        self.completed = []
+        self.failed = []
+
+    async def complete(self, job_id, lease_token, result):
+        self.completed.append(job_id)
+
+    async def fail(self, job_id, lease_token, error):
+        self.failed.append((job_id, lease_token, error))
+
+
+class FakePage:
+    async def close(self):
+        raise RuntimeError("browser already gone")
+
+
+class FakeContext:
+    async def new_page(self):
+        return FakePage()
+
+
+def test_process_job_releases_the_job_when_page_work_raises(backend, monkeypatch):
+    async def broken_job(page, job):
+        raise RuntimeError("selector exploded")
+    monkeypatch.setattr(backend, "run_job", broken_job)
+    client = FakeClient()
+    job = {"id": "j1", "kind": LISTING_JOB, "attempts": 1, "lease_token": "t1"}
+
+    asyncio.run(backend.process_job(client, FakeContext(), "w1", job))  # page.close() error is swallowed too
+
+    assert client.completed == []
+    assert client.failed == [("j1", "t1", "RuntimeError: selector exploded")]
+
+
+def test_process_job_releases_the_job_when_cancelled(backend, monkeypatch):
+    async def slow_job(page, job):
+        await asyncio.sleep(60)
+    monkeypatch.setattr(backend, "run_job", slow_job)
+    client = FakeClient()
+    job = {"id": "j1", "kind": DETAIL_JOB, "attempts": 1, "lease_token": "t1"}
+
+    async def cancel_midway():
+        task = asyncio.create_task(backend.process_job(client, FakeContext(), "w1", job))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_midway())
+
+    assert client.failed == [("j1", "t1", "worker stopped")]
@@ -0,0 +1,69 @@
+# Standalone scrape worker. Start as many of these as you like, on any machine
+# that can reach the API:
+#   python worker.py --server http://<api-host>:8000 --secret <SCRAPE_WORKER_SECRET> --pages 4
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import urllib.error
+import urllib.request
+
+from backend import run_worker
+
+
+class HttpQueueClient:
+    """Talks to the job endpoints of a running backend.py"""
+
+    def __init__(self, server, secret):
+        self.server = server.rstrip('/')
+        self.secret = secret
+
+    def _post(self, path, body):
+        request = urllib.request.Request(
+            f"{self.server}{path}",
+            data=json.dumps(body).encode(),
+            headers={'Content-Type': 'application/json', 'X-Worker-Secret': self.secret},
+            method='POST'
+        )
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return json.loads(response.read().decode())
+
+    async def _call(self, path, body):
+        try:
+            return await asyncio.to_thread(self._post, path, body)
+        except urllib.error.HTTPError as e:
+            print(f"⚠️  Queue server rejected {path}: {e.code} {e.read().decode(errors='replace')[:200]}")
+            return None
+        except (urllib.error.URLError, OSError) as e:
+            print(f"⚠️  Queue server unreachable ({path}): {e}")
+            return None
+
+    async def lease(self, worker_id):
+        return await self._call('/jobs/lease', {'worker_id': worker_id})
+
+    async def complete(self, job_id, lease_token, result):
+        return await self._call(f'/jobs/{job_id}/complete', {'lease_token': lease_token, 'result': result})
+
+    async def fail(self, job_id, lease_token, error):
+        return await self._call(f'/jobs/{job_id}/fail', {'lease_token': lease_token, 'error': error})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hackathon scrape worker')
+    parser.add_argument('--server', default='http://localhost:8000', help='Aggregator API base URL')
+    parser.add_argument('--secret', default=os.getenv('SCRAPE_WORKER_SECRET'),
+                        help='Shared worker secret (default: $SCRAPE_WORKER_SECRET)')
+    parser.add_argument('--pages', type=int, default=4, help='Jobs to run in parallel')
+    parser.add_argument('--worker-id', default=socket.gethostname(), help='Name shown in job leases')
+    args = parser.parse_args()
+    if not args.secret:
+        parser.error('a worker secret is required (--secret or SCRAPE_WORKER_SECRET)')
+
+    print(f"\n🚀 Scrape worker {args.worker_id} pulling jobs from {args.server}\n")
+    asyncio.run(run_worker(HttpQueueClient(args.server, args.secret), args.worker_id, args.pages))
+
+
+if __name__ == '__main__':
+    main()